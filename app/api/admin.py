@@ -11,6 +11,7 @@ from pydantic import BaseModel
 from typing import Dict, Any
 
 from app.core import state
+from app.services.inference import warm_model
 from app.utils.stats import check_canary_health
 
 # Create router for admin endpoints
@@ -37,33 +38,34 @@ async def deploy_canary(request: CanaryDeployRequest):
     if not os.path.exists(request.model_path):
         raise HTTPException(status_code=404, detail=f"Model file not found: {request.model_path}")
     
+    # Keep the current canary so a failed deployment leaves it in place
+    previous_canary_path = state.model_manager.canary_model_path
+    
     # Try to load the model - this will be handled by the model manager now
     try:
         # Update canary model path in the model manager
         state.model_manager.canary_model_path = request.model_path
-        # Test loading the model to ensure it works
-        _ = state.model_manager.canary_model
+        # Load and warm the model so it works and the first canary request doesn't pay the load cost
+        warm_model(state.model_manager.canary_model)
     except Exception as e:
+        state.model_manager.canary_model_path = previous_canary_path
         raise HTTPException(status_code=400, detail=f"Failed to load model: {str(e)}")
     
     # Update canary-related variables with thread-safe access
+    canary_start_time = datetime.datetime.now().isoformat()
     with state.state_lock:
-        state.canary_start_time = datetime.datetime.now().isoformat()
+        state.canary_start_time = canary_start_time
         state.alert_status = {}
     
     # Reset metrics with thread-safe access
-    with state.metrics_lock:
-        state.canary_metrics = {
-            "stable": {"latencies_ms": []},
-            "canary": {"latencies_ms": []}
-        }
+    state.reset_canary_metrics()
     
     # Return success response
     return {
         "status": "success",
         "message": "Canary model deployed successfully",
         "model_path": request.model_path,
-        "canary_start_time": state.canary_start_time
+        "canary_start_time": canary_start_time
     }
 
 @router.post("/rollback-canary")
@@ -77,7 +79,7 @@ async def rollback_canary():
         Dict containing rollback status and information
     """
     # Check if a canary model is active
-    if state.canary_model() is None:
+    if not state.model_manager.has_canary:
         return {
             "status": "error",
             "message": "No active canary to rollback"
@@ -90,11 +92,7 @@ async def rollback_canary():
         state.canary_start_time = None
         state.alert_status = {}
         
-    with state.metrics_lock:
-        state.canary_metrics = {
-            "stable": {"latencies_ms": []},
-            "canary": {"latencies_ms": []}
-        }
+    state.reset_canary_metrics()
     
     # Return success response
     return {
@@ -114,14 +112,16 @@ async def promote_canary():
         Dict containing promotion status and information
     """
     # Check if a canary model is active
-    if state.canary_model() is None:
+    if not state.model_manager.has_canary:
         return {
             "status": "error",
             "message": "No active canary to promote"
         }
     
-    # Check if any alerts were triggered
-    if state.alert_status.get("alert_triggered", False):
+    # Check if any alerts were triggered, reading the status with thread-safe access
+    with state.state_lock:
+        alert_triggered = state.alert_status.get("alert_triggered", False)
+    if alert_triggered:
         return {
             "status": "error",
             "message": "Cannot promote canary with active alerts"
@@ -133,9 +133,8 @@ async def promote_canary():
     # Promote canary to stable - update the model paths
     canary_path = state.model_manager.canary_model_path
     
-    # Update the stable model path in the model manager
-    # This requires modifying the internal attribute since we don't have a setter for stable_model_path
-    state.model_manager._stable_model_path = canary_path
+    # Update the stable model path in the model manager with thread-safe access
+    state.model_manager.stable_model_path = canary_path
     
     # Reset canary-related state with thread-safe access
     state.model_manager.canary_model_path = None
@@ -144,11 +143,7 @@ async def promote_canary():
         state.canary_start_time = None
         state.alert_status = {}
         
-    with state.metrics_lock:
-        state.canary_metrics = {
-            "stable": {"latencies_ms": []},
-            "canary": {"latencies_ms": []}
-        }
+    state.reset_canary_metrics()
     
     # Return success response
     return {
@@ -180,7 +175,7 @@ async def toggle_slowdown():
     
     # Return the updated state
     return {
-        "simulate_slowdown": bool(state.simulate_slowdown),  # Ensure it's a Python bool
+        "simulate_slowdown": current_slowdown,
         "message": message
     }
 
@@ -6,15 +6,16 @@ Includes thread-safe mechanisms for concurrent access to shared state.
 
 import joblib
 import datetime
+import numpy as np
+import onnxruntime as ort
 import logging
 import os
+import pickle
 import threading
-from typing import Dict, List, Optional, Any
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any, Tuple
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger("app_state")
+logger = logging.getLogger(__name__)
 
 # Model cache
 _model_cache = {}
@@ -28,6 +29,32 @@ class ModelManager:
         self._model_cache = {}
         self._cache_lock = threading.Lock()
     
+    def _load_model(self, model_path):
+        """Load a model artifact, choosing the loader from the file extension"""
+        if model_path.endswith(".onnx"):
+            # A single intra-op thread avoids oversubscribing cores for a tiny model
+            sess_options = ort.SessionOptions()
+            sess_options.intra_op_num_threads = 1
+            session = ort.InferenceSession(model_path, sess_options, providers=["CPUExecutionProvider"])
+            session._input_name = session.get_inputs()[0].name
+            session._n_features = session.get_inputs()[0].shape[1]
+            return session
+        
+        if model_path.endswith((".pkl", ".pickle")):
+            # Plain pickles are cheapest to read for small models
+            with open(model_path, "rb") as f:
+                model = pickle.load(f)
+        else:
+            # Memory-map numpy arrays instead of copying them into the process
+            model = joblib.load(model_path, mmap_mode="r")
+        # Precompute the linear decision function so inference can
+        # skip sklearn's per-call input validation
+        model._coef = model.coef_.astype(np.float64).ravel()
+        model._intercept = float(model.intercept_[0])
+        model._coef_tuple = tuple(float(c) for c in model._coef)
+        model._n_features = model._coef.size
+        return model
+    
     def get_model(self, model_path):
         if not model_path:
             return None
@@ -35,12 +62,12 @@ class ModelManager:
         # Use thread-safe access to the model cache
         with self._cache_lock:
             if model_path not in self._model_cache:
-                logger.info(f"Loading model from {model_path}")
+                logger.info("Loading model from %s", model_path)
                 start_time = datetime.datetime.now()
-                self._model_cache[model_path] = joblib.load(model_path)
+                self._model_cache[model_path] = self._load_model(model_path)
                 end_time = datetime.datetime.now()
                 load_time = (end_time - start_time).total_seconds() * 1000
-                logger.info(f"Model loaded in {load_time:.2f}ms")
+                logger.info("Model loaded in %.2fms", load_time)
             return self._model_cache[model_path]
     
     @property
@@ -61,6 +88,11 @@ class ModelManager:
         with self._cache_lock:
             self._canary_model_path = path
     
+    @property
+    def has_canary(self):
+        """Whether a canary is deployed, without touching the model cache"""
+        return self._canary_model_path is not None
+    
     @property
     def stable_model(self):
         return self.get_model(self._stable_model_path)
@@ -89,16 +121,68 @@ def stable_model():
 def canary_model():
     return model_manager.canary_model
 
+def new_canary_metrics() -> Dict[str, Dict[str, int]]:
+    """Create empty latency accumulators (nanoseconds) for the stable and canary models"""
+    return {
+        "stable": {"sum": 0, "sumsq": 0, "count": 0},
+        "canary": {"sum": 0, "sumsq": 0, "count": 0}
+    }
+
 # Canary deployment tracking
-canary_metrics: Dict[str, Dict[str, List[float]]] = {
-    "stable": {"latencies_ms": []},
-    "canary": {"latencies_ms": []}
-}
+canary_metrics: Dict[str, Dict[str, int]] = new_canary_metrics()
 
 # Locks for thread-safe access to shared state
 metrics_lock = threading.Lock()
 state_lock = threading.Lock()  # For other state variables
 
+# Per-thread pending latency samples as (model_name, latency_ns). Recording
+# appends to the calling thread's deque without a lock; samples are merged into
+# canary_metrics under metrics_lock by flush_latencies
+LATENCY_FLUSH_THRESHOLD = 1024
+_latency_local = threading.local()
+_latency_buffers: List[Deque[Tuple[str, int]]] = []
+_latency_buffers_lock = threading.Lock()  # Only taken when a thread registers its buffer
+
+def record_latency(model_name: str, latency_ns: int) -> None:
+    """Queue a latency sample for a model in the calling thread's buffer"""
+    buf = getattr(_latency_local, "buf", None)
+    if buf is None:
+        buf = _latency_local.buf = deque()
+        with _latency_buffers_lock:
+            _latency_buffers.append(buf)
+    buf.append((model_name, latency_ns))
+    if len(buf) >= LATENCY_FLUSH_THRESHOLD:
+        flush_latencies()
+
+def _drain_latency_buffers() -> List[Tuple[str, int]]:
+    """Pop all pending samples; deque.popleft is safe against concurrent appends"""
+    with _latency_buffers_lock:
+        buffers = list(_latency_buffers)
+    samples = []
+    for buf in buffers:
+        while True:
+            try:
+                samples.append(buf.popleft())
+            except IndexError:
+                break
+    return samples
+
+def flush_latencies() -> None:
+    """Merge pending per-thread latency samples into canary_metrics"""
+    with metrics_lock:
+        for model_name, latency_ns in _drain_latency_buffers():
+            bucket = canary_metrics[model_name]
+            bucket["sum"] += latency_ns
+            bucket["sumsq"] += latency_ns * latency_ns
+            bucket["count"] += 1
+
+def reset_canary_metrics() -> None:
+    """Clear latency metrics, discarding samples not yet flushed"""
+    global canary_metrics
+    with metrics_lock:
+        _drain_latency_buffers()
+        canary_metrics = new_canary_metrics()
+
 # Alert management
 alert_status: Dict[str, Any] = {}
 
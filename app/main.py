@@ -3,28 +3,77 @@ FastAPI application for customer churn prediction with canary deployment support
 Manages both stable and canary models with performance monitoring.
 """
 
+import logging
+
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from threadpoolctl import threadpool_limits
 
 from app.api import predict, admin
+from app.core import state
+from app.services.kernel import sigmoid5
+from app.services.inference import (
+    warm_model, start_batch_workers, stop_batch_workers, start_metrics_flusher, stop_metrics_flusher
+)
+
+# Configure logging once for the whole application
+logging.basicConfig(level=logging.INFO, 
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Limit native thread pools to one thread even when the BLAS environment
+# variables were not set before numpy was imported (e.g. `uvicorn app.main:app`)
+threadpool_limits(1)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Churn Prediction API", 
-    description="API for customer churn prediction with canary deployment support"
+    description="API for customer churn prediction with canary deployment support",
+    default_response_class=ORJSONResponse
 )
 
+# Compress larger responses for dashboards polling over slow links
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
 # Include routers from api modules
 app.include_router(predict.router)
 app.include_router(admin.router)
 
+@app.on_event("startup")
+async def warm_models():
+    """Load and warm the active models so the first requests don't pay the load cost."""
+    # Compile the 5-feature kernel (or load it from the numba cache)
+    sigmoid5(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    for model in (state.model_manager.stable_model, state.model_manager.canary_model):
+        if model is not None:
+            warm_model(model)
+
+@app.on_event("startup")
+async def start_batching():
+    """Start the per-model micro-batch workers used by /predict."""
+    start_batch_workers()
+
+@app.on_event("startup")
+async def start_flushing():
+    """Start merging per-thread latency samples into the shared metrics."""
+    start_metrics_flusher()
+
+@app.on_event("shutdown")
+async def stop_batching():
+    """Stop the micro-batch workers."""
+    await stop_batch_workers()
+
+@app.on_event("shutdown")
+async def stop_flushing():
+    """Stop the periodic latency flush."""
+    await stop_metrics_flusher()
+
 @app.get("/")
 async def root():
     """Root endpoint that returns basic API information."""
-    from app.core import state
-    
     return {
         "message": "Churn Prediction API",
-        "stable_model": state.stable_model_path,
-        "canary_model": state.canary_model_path,
-        "canary_active": state.canary_model is not None
+        "stable_model": state.model_manager.stable_model_path,
+        "canary_model": state.model_manager.canary_model_path,
+        "canary_active": state.model_manager.has_canary
     }
\ No newline at end of file
@@ -1,19 +1,119 @@
 """
 Inference service for prediction routing and latency measurement.
 Handles model selection, prediction execution, and latency tracking.
+Concurrent requests can be micro-batched so each model is called once per batch.
 """
 
+import asyncio
+import itertools
+import math
 import time
 import random
 import logging
-from typing import List, Dict, Any
+import numpy as np
+import onnxruntime as ort
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import HTTPException
+from scipy.special import expit
+from starlette.concurrency import run_in_threadpool
 
 from app.core import state
+from app.services.kernel import sigmoid5
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger("inference_service")
+logger = logging.getLogger(__name__)
+
+# Micro-batching limits: a worker collects up to MAX_BATCH_SIZE queued
+# requests, spending at most MAX_BATCH_WAIT_S draining its queue
+MAX_BATCH_SIZE = 64
+MAX_BATCH_WAIT_S = 0.001
+
+# One queue per model so traffic is split at enqueue time
+_queues: Dict[str, "asyncio.Queue[Tuple[List[float], asyncio.Future]]"] = {}
+_workers: List[asyncio.Task] = []
+
+# How often pending per-thread latency samples are merged into the metrics
+METRICS_FLUSH_INTERVAL_S = 0.5
+_metrics_flusher: Optional[asyncio.Task] = None
+
+# Process-wide request counter for canary routing; next() on
+# itertools.count is atomic in CPython, so it is safe across threads
+_req_counter = itertools.count()
+
+def predict_proba_fast(model, features: List[float]) -> float:
+    """
+    Compute the churn probability for a single row of features.
+    
+    For sklearn models, evaluates the logistic function directly from the
+    coefficients cached by the ModelManager at load time, bypassing
+    sklearn's predict_proba. 5-feature models go through the compiled
+    sigmoid5 kernel. ONNX models are run through their session.
+    
+    Args:
+        model: Loaded model with precomputed _coef and _intercept, or an ONNX session
+        features: List of float features for prediction
+    
+    Returns:
+        Probability of the positive class (churn)
+    """
+    if isinstance(model, ort.InferenceSession):
+        inputs = {model._input_name: np.asarray([features], dtype=np.float32)}
+        # Outputs are (label, probabilities); probabilities has shape (1, 2)
+        return float(model.run(None, inputs)[1][0][1])
+    
+    # 5-feature models use the compiled kernel, which allocates nothing
+    if len(features) == 5 and len(model._coef_tuple) == 5:
+        c0, c1, c2, c3, c4 = model._coef_tuple
+        return sigmoid5(*features, c0, c1, c2, c3, c4, model._intercept)
+    
+    z = float(np.dot(np.asarray(features, dtype=np.float64), model._coef)) + model._intercept
+    # Branch on the sign of z so math.exp never overflows
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
+
+def predict_proba_batch(model, features_batch: np.ndarray) -> np.ndarray:
+    """
+    Compute churn probabilities for a stacked batch of feature rows.
+    
+    Args:
+        model: Loaded model with precomputed _coef and _intercept, or an ONNX session
+        features_batch: Array of shape (n_rows, n_features)
+    
+    Returns:
+        Array of positive class (churn) probabilities, one per row
+    """
+    if isinstance(model, ort.InferenceSession):
+        inputs = {model._input_name: features_batch.astype(np.float32)}
+        return model.run(None, inputs)[1][:, 1]
+    
+    return expit(features_batch @ model._coef + model._intercept)
+
+def warm_model(model) -> None:
+    """
+    Run one dummy prediction so lazy imports and allocations happen up front.
+    
+    Args:
+        model: Loaded model as returned by the ModelManager
+    """
+    predict_proba_fast(model, [0.0] * model._n_features)
+
+def _select_model() -> Tuple[Any, str]:
+    """
+    Pick the model for a request, sending exactly 10% of traffic to the canary if available.
+    
+    Every tenth request by arrival order goes to the canary, which samples
+    uniformly regardless of clock resolution.
+    
+    Returns:
+        Tuple of the model and its metrics bucket name ("stable" or "canary")
+    """
+    idx = next(_req_counter)
+    # Resolve the canary once so the check and the selection see the same model
+    canary = state.canary_model()
+    if canary is not None and idx % 10 == 0:
+        return canary, "canary"
+    return state.stable_model(), "stable"
 
 def route_prediction(features: List[float]) -> Dict[str, Any]:
     """
@@ -25,56 +125,169 @@ def route_prediction(features: List[float]) -> Dict[str, Any]:
     Returns:
         Dict containing prediction result, model used, and latency
     """
-    request_id = f"req_{int(time.time() * 1000)}"
-    logger.info(f"[{request_id}] Processing prediction request with {len(features)} features")
-    
-    # Determine which model to use (exactly 10% to canary if available)
-    # Use last digit of request_id timestamp for deterministic routing
-    timestamp = int(request_id.split('_')[1])
-    use_canary = state.canary_model() is not None and (timestamp % 10 == 0)
-    model = state.canary_model() if use_canary else state.stable_model()
-    model_name = "canary" if use_canary else "stable"
+    ts_ms = time.time_ns() // 1_000_000
+    logger.info("[req_%d] Processing prediction request with %d features", ts_ms, len(features))
     
-    logger.info(f"[{request_id}] Routing request to {model_name} model")
+    # Determine which model to use
+    model, model_name = _select_model()
     
-    # Prepare features for prediction
-    features_array = [features]
-    
-    # Measure prediction latency
-    start_time = time.perf_counter()
+    # Measure prediction latency in integer nanoseconds
+    start_ns = time.perf_counter_ns()
     
     # Add simulated slowdown for canary model if enabled
-    if use_canary and state.simulate_slowdown:
-        logger.debug(f"[{request_id}] Applying simulated slowdown for canary model")
+    if model_name == "canary" and state.simulate_slowdown:
+        logger.debug("[req_%d] Applying simulated slowdown for canary model", ts_ms)
         time.sleep(0.01)
     
-    # Log model prediction start
-    model_start_time = time.perf_counter()
-    logger.debug(f"[{request_id}] Starting model prediction")
-    
     # Get prediction probability for class 1 (churn)
-    probabilities = model.predict_proba(features_array)
-    churn_probability = float(probabilities[0][1])
+    churn_probability = predict_proba_fast(model, features)
+    
+    latency_ns = time.perf_counter_ns() - start_ns
+    state.record_latency(model_name, latency_ns)
+    
+    # Convert to milliseconds only for reporting
+    latency_ms = latency_ns / 1e6
+    
+    logger.info("[req_%d] Request completed: model=%s, latency=%sms", ts_ms, model_name, latency_ms)
+    
+    # Return prediction result
+    return {
+        "churn_probability": churn_probability,
+        "model_used": model_name,
+        "latency_ms": latency_ms,
+        "request_id": f"req_{ts_ms}"
+    }
+
+async def batch_worker(model_name: str) -> None:
+    """
+    Serve queued requests for one model in micro-batches.
+    
+    Waits for a request, drains whatever else is already queued (bounded by
+    MAX_BATCH_SIZE and MAX_BATCH_WAIT_S), and runs a single batched predict.
+    A batch of one goes through predict_proba_fast instead.
+    Latency is measured and recorded per request by route_prediction_batched.
+    
+    Args:
+        model_name: Queue and metrics bucket name ("stable" or "canary")
+    """
+    queue = _queues[model_name]
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        items = [await queue.get()]
+        batch_start = loop.time()
+        while len(items) < MAX_BATCH_SIZE and (loop.time() - batch_start) < MAX_BATCH_WAIT_S:
+            try:
+                items.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        
+        # Any failure, including a model load, is passed to this batch's
+        # requests so the worker keeps serving the queue
+        try:
+            # Requests queued for a canary that has since been rolled back go to stable
+            served_by = model_name
+            model = state.canary_model() if model_name == "canary" else state.stable_model()
+            if model is None:
+                served_by = "stable"
+                model = state.stable_model()
+            
+            # Add simulated slowdown for canary model if enabled
+            if served_by == "canary" and state.simulate_slowdown:
+                await asyncio.sleep(0.01)
+            
+            # A lone request skips array stacking and uses the single-row kernel
+            if len(items) == 1:
+                probabilities = [predict_proba_fast(model, items[0][0])]
+            else:
+                probabilities = predict_proba_batch(model, np.array([f for f, _ in items], dtype=np.float64))
+            for (_, future), probability in zip(items, probabilities):
+                if not future.done():
+                    future.set_result((float(probability), served_by))
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+def start_batch_workers() -> None:
+    """Create the per-model queues and start their batch workers on the running loop."""
+    for model_name in ("stable", "canary"):
+        _queues[model_name] = asyncio.Queue()
+        _workers.append(asyncio.create_task(batch_worker(model_name)))
+
+async def stop_batch_workers() -> None:
+    """Cancel the batch workers; later requests fall back to route_prediction."""
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queues.clear()
+
+async def metrics_flusher() -> None:
+    """Periodically merge pending latency samples into the shared metrics."""
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_INTERVAL_S)
+        state.flush_latencies()
+
+def start_metrics_flusher() -> None:
+    """Start the periodic latency flush on the running loop."""
+    global _metrics_flusher
+    _metrics_flusher = asyncio.create_task(metrics_flusher())
+
+async def stop_metrics_flusher() -> None:
+    """Cancel the periodic flush and merge whatever is still pending."""
+    global _metrics_flusher
+    if _metrics_flusher is not None:
+        _metrics_flusher.cancel()
+        await asyncio.gather(_metrics_flusher, return_exceptions=True)
+        _metrics_flusher = None
+    state.flush_latencies()
+
+async def route_prediction_batched(features: List[float]) -> Dict[str, Any]:
+    """
+    Route prediction through the micro-batcher for the selected model.
+    
+    Falls back to the single-row route_prediction when the batch workers
+    are not running, run in the threadpool so its blocking simulated
+    slowdown can't stall the event loop.
+    
+    Args:
+        features: List of float features for prediction
+    
+    Returns:
+        Dict containing prediction result, model used, and latency
+    """
+    if not _queues:
+        return await run_in_threadpool(route_prediction, features)
+    
+    ts_ms = time.time_ns() // 1_000_000
+    logger.info("[req_%d] Processing prediction request with %d features", ts_ms, len(features))
+    
+    # Determine which model to use
+    model, model_name = _select_model()
     
-    # Log model prediction completion
-    model_end_time = time.perf_counter()
-    model_time_ms = (model_end_time - model_start_time) * 1000
-    logger.debug(f"[{request_id}] Model prediction completed in {model_time_ms:.2f}ms")
+    # Reject malformed rows here so they can't fail a whole batch
+    if len(features) != model._n_features:
+        raise HTTPException(status_code=422, detail=f"Expected {model._n_features} features, got {len(features)}")
     
-    # Calculate total latency
-    end_time = time.perf_counter()
-    latency_ms = (end_time - start_time) * 1000
+    # Measure from enqueue to result so queue wait counts toward latency,
+    # giving one independent sample per request
+    start_ns = time.perf_counter_ns()
+    future = asyncio.get_running_loop().create_future()
+    _queues[model_name].put_nowait((features, future))
+    churn_probability, model_name = await future
+    latency_ns = time.perf_counter_ns() - start_ns
+    state.record_latency(model_name, latency_ns)
     
-    # Store latency in metrics with thread-safe access
-    with state.metrics_lock:
-        state.canary_metrics[model_name]["latencies_ms"].append(latency_ms)
+    # Convert to milliseconds only for reporting
+    latency_ms = latency_ns / 1e6
     
-    logger.info(f"[{request_id}] Request completed: model={model_name}, latency={latency_ms}ms")
+    logger.info("[req_%d] Request completed: model=%s, latency=%sms", ts_ms, model_name, latency_ms)
     
     # Return prediction result
     return {
         "churn_probability": churn_probability,
         "model_used": model_name,
         "latency_ms": latency_ms,
-        "request_id": request_id
+        "request_id": f"req_{ts_ms}"
     }
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Compiled prediction kernels for fixed-size feature vectors.
+Specialized for the 5-feature churn models so a single-row predict
+runs as one native call with no array allocation.
+"""
+
+import math
+from numba import njit
+
+@njit(cache=True)
+def sigmoid5(f0, f1, f2, f3, f4, c0, c1, c2, c3, c4, b):
+    """
+    Logistic regression probability for exactly 5 features.
+    
+    Args:
+        f0-f4: Feature values
+        c0-c4: Model coefficients
+        b: Model intercept
+    
+    Returns:
+        Probability of the positive class
+    """
+    z = f0 * c0 + f1 * c1 + f2 * c2 + f3 * c3 + f4 * c4 + b
+    # Branch on the sign of z so math.exp never overflows
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
\ No newline at end of file
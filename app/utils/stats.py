@@ -3,39 +3,91 @@ Statistical utilities for canary deployment health monitoring.
 Provides functions for analyzing latency metrics and determining canary health.
 """
 
-import numpy as np
-from scipy import stats
-from typing import Dict, Any
+import math
+from scipy.special import stdtr
+from typing import Dict, Any, Tuple
 
 from app.core import state
 
+def welch_ttest(mean1: float, var1: float, n1: int,
+                mean2: float, var2: float, n2: int) -> Tuple[float, float]:
+    """
+    Two-sided Welch's t-test from summary statistics.
+    
+    Equivalent to scipy.stats.ttest_ind(sample2, sample1, equal_var=False)
+    without scipy's argument handling and intermediate arrays.
+    
+    Args:
+        mean1, var1, n1: Mean, sample variance (ddof=1) and size of the first group
+        mean2, var2, n2: Mean, sample variance (ddof=1) and size of the second group
+    
+    Returns:
+        Tuple of (t statistic, p-value) for mean2 - mean1
+    """
+    se1 = var1 / n1
+    se2 = var2 / n2
+    se_sq = se1 + se2
+    
+    # Constant samples: the test is undefined, so only an exact mean difference counts
+    if se_sq == 0:
+        if mean1 == mean2:
+            return 0.0, 1.0
+        return math.copysign(math.inf, mean2 - mean1), 0.0
+    
+    t_stat = (mean2 - mean1) / math.sqrt(se_sq)
+    # Welch-Satterthwaite degrees of freedom
+    df = se_sq ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+    p_value = 2.0 * float(stdtr(df, -abs(t_stat)))
+    return t_stat, p_value
+
+def _mean_var_ms(total_ns: int, total_sq_ns: int, count: int) -> Tuple[float, float]:
+    """
+    Mean and sample variance (ddof=1) in milliseconds from nanosecond running sums.
+    
+    The sums are exact Python integers, so the variance numerator is computed
+    without the cancellation error of the floating-point sum-of-squares formula.
+    
+    Args:
+        total_ns: Sum of latencies in nanoseconds
+        total_sq_ns: Sum of squared latencies in nanoseconds
+        count: Number of samples (at least 2)
+    
+    Returns:
+        Tuple of (mean, variance) in milliseconds and milliseconds squared
+    """
+    mean = total_ns / count / 1e6
+    var = (count * total_sq_ns - total_ns * total_ns) / (count * (count - 1)) / 1e12
+    return mean, var
+
 def check_canary_health() -> Dict[str, Any]:
     """
     Check the health of the canary deployment by comparing latency metrics.
     
     Performs Welch's t-test to determine if canary latency is significantly higher.
     Requires at least 20 latency samples for both stable and canary models.
+    Uses running sums kept per model, so the cost is independent of history length.
     Triggers an alert if p-value < 0.05 and canary average latency > stable average.
     
     Returns:
         Dict containing analysis results and alert status
     """
-    # Check if a canary model is active
-    if state.canary_model() is None:
+    # Check if a canary model is active without loading it
+    if state.model_manager.canary_model_path is None:
         return {
             "alert_triggered": False,
             "message": "No active canary deployment to monitor."
         }
     
-    # Get latency samples with thread-safe access
+    # Merge samples still pending in per-thread buffers, then read the
+    # latency accumulators with thread-safe access
+    state.flush_latencies()
     with state.metrics_lock:
-        stable_latencies = state.canary_metrics["stable"]["latencies_ms"].copy()
-        canary_latencies = state.canary_metrics["canary"]["latencies_ms"].copy()
+        stable_bucket = state.canary_metrics["stable"]
+        canary_bucket = state.canary_metrics["canary"]
+        stable_sum, stable_sumsq, stable_count = stable_bucket["sum"], stable_bucket["sumsq"], stable_bucket["count"]
+        canary_sum, canary_sumsq, canary_count = canary_bucket["sum"], canary_bucket["sumsq"], canary_bucket["count"]
     
     # Check if we have enough samples
-    stable_count = len(stable_latencies)
-    canary_count = len(canary_latencies)
-    
     if stable_count < 20 or canary_count < 20:
         return {
             "alert_triggered": False,
@@ -44,26 +96,27 @@ def check_canary_health() -> Dict[str, Any]:
             "canary_sample_count": canary_count
         }
     
-    # Calculate average latencies
-    stable_avg = np.mean(stable_latencies)
-    canary_avg = np.mean(canary_latencies)
+    # Calculate average latencies and variances in milliseconds
+    stable_avg, stable_var = _mean_var_ms(stable_sum, stable_sumsq, stable_count)
+    canary_avg, canary_var = _mean_var_ms(canary_sum, canary_sumsq, canary_count)
     
     # Perform Welch's t-test
-    t_stat, p_value = stats.ttest_ind(canary_latencies, stable_latencies, equal_var=False)
+    t_stat, p_value = welch_ttest(stable_avg, stable_var, stable_count,
+                                  canary_avg, canary_var, canary_count)
     
     # Determine if alert should be triggered
-    # Convert NumPy boolean to Python native boolean with bool()
-    alert_triggered = bool(p_value < 0.05 and canary_avg > stable_avg)
+    # All statistics are plain Python floats and ints, so no conversion is needed
+    alert_triggered = p_value < 0.05 and canary_avg > stable_avg
     
     # Update alert status in global state with thread-safe access
     with state.state_lock:
         state.alert_status = {
             "alert_triggered": alert_triggered,
-            "p_value": round(float(p_value), 3),
-            "stable_avg_latency_ms": round(float(stable_avg), 1),
-            "canary_avg_latency_ms": round(float(canary_avg), 1),
-            "stable_sample_count": int(stable_count),
-            "canary_sample_count": int(canary_count)
+            "p_value": p_value,
+            "stable_avg_latency_ms": stable_avg,
+            "canary_avg_latency_ms": canary_avg,
+            "stable_sample_count": stable_count,
+            "canary_sample_count": canary_count
         }
     
     # Prepare response message
@@ -74,11 +127,11 @@ def check_canary_health() -> Dict[str, Any]:
     
     # Return appropriate response
     return {
-        "alert_triggered": alert_triggered,  # Already converted to Python bool
-        "p_value": round(float(p_value), 3),
+        "alert_triggered": alert_triggered,
+        "p_value": p_value,
         "message": message,
-        "stable_avg_latency_ms": round(float(stable_avg), 1),
-        "canary_avg_latency_ms": round(float(canary_avg), 1),
-        "stable_sample_count": int(stable_count),  # Ensure count is Python int
-        "canary_sample_count": int(canary_count)   # Ensure count is Python int
+        "stable_avg_latency_ms": stable_avg,
+        "canary_avg_latency_ms": canary_avg,
+        "stable_sample_count": stable_count,
+        "canary_sample_count": canary_count
     }
\ No newline at end of file
@@ -3,11 +3,22 @@
 
 """
 Entry point for the FastAPI application.
-Imports and runs the modular app from the app package.
+Runs the modular app from the app package via its import string.
 """
 
+import os
+
+# Pin BLAS/OpenMP to one thread per worker before numpy is imported; a 1x5
+# predict gains nothing from threads and workers oversubscribe cores otherwise
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+
 import uvicorn
-from app.main import app
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Canary deployment state and latency metrics are held per process, so
+    # more than one worker splits them across processes; see the README
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    # "auto" picks uvloop and httptools, installed with uvicorn[standard]
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=workers, loop="auto", http="auto")
\ No newline at end of file
@@ -4,6 +4,7 @@
 """
 Train script for customer churn prediction models.
 Creates two logistic regression models with different random states.
+Each model is saved both as a joblib pickle and as an ONNX graph.
 """
 
 import numpy as np
@@ -11,6 +12,16 @@ from sklearn.datasets import make_classification
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+def export_onnx(model, path):
+    """Convert a fitted model to ONNX with a plain probability tensor output."""
+    initial_types = [("input", FloatTensorType([None, 5]))]
+    # Disable ZipMap so probabilities come back as a (N, 2) tensor rather than dicts
+    onx = convert_sklearn(model, initial_types=initial_types, options={id(model): {"zipmap": False}})
+    with open(path, "wb") as f:
+        f.write(onx.SerializeToString())
 
 # Generate synthetic data for customer churn prediction
 # Binary classification: 1 = churn, 0 = no churn
@@ -42,6 +53,8 @@ print(f"Model v1 accuracy: {accuracy_v1:.4f}")
 # Save model_v1
 joblib.dump(model_v1, 'models/model_v1.joblib')
 print("Model v1 saved as models/model_v1.joblib")
+export_onnx(model_v1, 'models/model_v1.onnx')
+print("Model v1 exported as models/model_v1.onnx")
 
 # Generate new data with different random state for model_v2
 X_v2, y_v2 = make_classification(
@@ -71,5 +84,7 @@ print(f"Model v2 accuracy: {accuracy_v2:.4f}")
 # Save model_v2
 joblib.dump(model_v2, 'models/model_v2.joblib')
 print("Model v2 saved as models/model_v2.joblib")
+export_onnx(model_v2, 'models/model_v2.onnx')
+print("Model v2 exported as models/model_v2.onnx")
 
 print("Training complete. Both models have been saved.")
\ No newline at end of file